@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys
 import select
+import selectors
 import os
 from datetime import datetime
 import termios
@@ -10,146 +11,218 @@ import signal
 import fcntl
 import struct
 import re
+import time
 
-def strip_ansi_codes_for_output(text):
-    """Remove ANSI escape sequences from OUTPUT text for clean logging."""
+# The log is written through a 64KB buffer. It is flushed as soon as the
+# session goes quiet for 16ms, and at least every 100ms while output streams
+# (each output drain reads at most _DRAIN_LIMIT bytes before the loop gets
+# back to the flush check).
+_LOG_BUFFER_SIZE = 64 * 1024
+_LOG_QUIET_DELAY = 0.016
+_LOG_FLUSH_INTERVAL = 0.1
+
+# Log line markers, pre-encoded since the log file is written in binary mode
+_OUTPUT_PREFIX = b'[OUTPUT] '
+_INPUT_PREFIX = b'[USER INPUT] '
+_NEWLINE = b'\n'
+
+# struct winsize as used by TIOCGWINSZ/TIOCSWINSZ: rows, columns, x and y pixels
+_WINSIZE = struct.Struct('HHHH')
+
+# Upper bound for a single os.read from the PTY or stdin
+_READ_CHUNK = 64 * 1024
+
+# Most output handled per wakeup before returning to the selector, so a
+# flooding subprocess can't grow the buffers without bound or starve stdin
+_DRAIN_LIMIT = 16 * 1024
+
+# ANSI escape sequences to remove from OUTPUT, compiled once at import time.
+# They are pure ASCII, so they are matched on the raw bytes before decoding.
+# Every alternative starts with ESC, so it is factored out as a literal prefix
+# that lets the regex engine skip straight to candidate positions.
+_ANSI_OUTPUT_RE = re.compile(rb'\x1B(?:' + b'|'.join([
+    # CSI sequences (colors, cursor movement, etc.)
+    rb'\[[0-?]*[ -/]*[@-~]',
+    # OSC sequences (terminal title, etc.)
+    rb'\][^\x07\x1B]*(?:\x07|\x1B\\)',
+    # Two-character sequences (character sets, etc.)
+    rb'[()][A-Z0-9]',
+    # SS3 sequences (function keys)
+    rb'O[A-Z0-9]',
+    # Single character sequences
+    rb'[>=MNOPVXcmno78]',
+    # DCS, PM, APC sequences
+    rb'[PX^_][^\x1B]*\x1B\\',
+    # RIS (Reset to Initial State)
+    rb'c',
+]) + b')')
+
+def strip_ansi_codes_for_output(data):
+    """Remove ANSI escape sequences from raw OUTPUT bytes for clean logging."""
     # For output, we want to remove colors and formatting but keep the text content
-    patterns = [
-        # CSI sequences (colors, cursor movement, etc.)
-        r'\x1B\[[0-?]*[ -/]*[@-~]',
-        # OSC sequences (terminal title, etc.)
-        r'\x1B\][^\x07\x1B]*(?:\x07|\x1B\\)',
-        # Two-character sequences (character sets, etc.)
-        r'\x1B[()][A-Z0-9]',
-        # SS3 sequences (function keys)
-        r'\x1BO[A-Z0-9]',
-        # Single character sequences
-        r'\x1B[>=MNOPVXcmno78]',
-        # DCS, PM, APC sequences
-        r'\x1B[PX^_][^\x1B]*\x1B\\',
-        # RIS (Reset to Initial State)
-        r'\x1Bc',
-    ]
+    # Every sequence starts with ESC, so plain text can skip the regex entirely
+    if b'\x1b' not in data:
+        return data
+    return _ANSI_OUTPUT_RE.sub(b'', data)
 
-    combined_pattern = '|'.join(patterns)
-    ansi_pattern = re.compile(combined_pattern)
-    return ansi_pattern.sub('', text)
+# Readable names for the escape sequences of navigation and function keys
+_INPUT_ESCAPE_NAMES = {
+    # CSI format arrows (ESC [ X)
+    '\x1b[A': '[UP]',
+    '\x1b[B': '[DOWN]',
+    '\x1b[C': '[RIGHT]',
+    '\x1b[D': '[LEFT]',
+    # SS3 format arrows (ESC O X) - common in application mode
+    '\x1bOA': '[UP]',
+    '\x1bOB': '[DOWN]',
+    '\x1bOC': '[RIGHT]',
+    '\x1bOD': '[LEFT]',
+    # Navigation keys
+    '\x1b[H': '[HOME]',
+    '\x1b[F': '[END]',
+    '\x1bOH': '[HOME]',     # Alternative SS3 format
+    '\x1bOF': '[END]',      # Alternative SS3 format
+    '\x1b[3~': '[DELETE]',
+    '\x1b[2~': '[INSERT]',
+    '\x1b[5~': '[PAGE_UP]',
+    '\x1b[6~': '[PAGE_DOWN]',
+    # Function keys (SS3 format)
+    '\x1bOP': '[F1]',
+    '\x1bOQ': '[F2]',
+    '\x1bOR': '[F3]',
+    '\x1bOS': '[F4]',
+    # Bare ESC key (must come after the sequences that start with it)
+    '\x1b': '[ESC]',
+}
 
-def format_input_for_logging(text):
-    """Format user input for logging, preserving navigation keys but making them readable."""
-    # Convert escape sequences to readable format for logging
-    formatted = text
-    
-    # Replace common escape sequences with readable names
-    replacements = [
-        # CSI format arrows (ESC [ X)
-        ('\x1b[A', '[UP]'),
-        ('\x1b[B', '[DOWN]'),
-        ('\x1b[C', '[RIGHT]'),
-        ('\x1b[D', '[LEFT]'),
-        # SS3 format arrows (ESC O X) - common in application mode
-        ('\x1bOA', '[UP]'),
-        ('\x1bOB', '[DOWN]'),
-        ('\x1bOC', '[RIGHT]'),
-        ('\x1bOD', '[LEFT]'),
-        # Navigation keys
-        ('\x1b[H', '[HOME]'),
-        ('\x1b[F', '[END]'),
-        ('\x1bOH', '[HOME]'),     # Alternative SS3 format
-        ('\x1bOF', '[END]'),      # Alternative SS3 format
-        ('\x1b[3~', '[DELETE]'),
-        ('\x1b[2~', '[INSERT]'),
-        ('\x1b[5~', '[PAGE_UP]'),
-        ('\x1b[6~', '[PAGE_DOWN]'),
-        # Function keys (SS3 format)
-        ('\x1bOP', '[F1]'),
-        ('\x1bOQ', '[F2]'),
-        ('\x1bOR', '[F3]'),
-        ('\x1bOS', '[F4]'),
-        # Editing keys
-        ('\x7f', '[BACKSPACE]'),
-        ('\x08', '[BACKSPACE]'),
-        ('\x1b', '[ESC]'),
-    ]
-    
-    for escape_seq, readable in replacements:
-        formatted = formatted.replace(escape_seq, readable)
+# Matches every sequence above in a single pass, trying them in order
+_INPUT_ESCAPE_RE = re.compile('|'.join(map(re.escape, _INPUT_ESCAPE_NAMES)))
+
+# Control bytes that aren't useful for logging, deleted from raw input
+# before it is decoded
+_INPUT_CONTROL_BYTES = bytes([
+    0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07,
+    0x0b, 0x0c, 0x0e, 0x0f, 0x10, 0x11, 0x12, 0x13,
+    0x14, 0x15, 0x16, 0x17, 0x18, 0x19, 0x1a, 0x1c,
+    0x1d, 0x1e, 0x1f
+])
+
+# Editing keys, made readable in a single translate pass
+_INPUT_EDITING_KEYS = str.maketrans({
+    '\x7f': '[BACKSPACE]',
+    '\x08': '[BACKSPACE]',
+})
+
+def format_input_for_logging(data):
+    """Format raw user input bytes for logging, preserving navigation keys but making them readable."""
+    # Remove control characters that aren't useful for logging with one
+    # table lookup per byte, then decode what is left
+    formatted = data.translate(None, _INPUT_CONTROL_BYTES).decode('utf-8', errors='replace')
     
-    # Remove other control characters that aren't useful for logging
-    control_chars_to_remove = [
-        '\x00', '\x01', '\x02', '\x03', '\x04', '\x05', '\x06', '\x07',
-        '\x0b', '\x0c', '\x0e', '\x0f', '\x10', '\x11', '\x12', '\x13',
-        '\x14', '\x15', '\x16', '\x17', '\x18', '\x19', '\x1a', '\x1c',
-        '\x1d', '\x1e', '\x1f'
-    ]
+    # Replace common escape sequences with readable names.
+    # Plain keystrokes contain no ESC, so skip scanning for escape sequences.
+    if '\x1b' in formatted:
+        formatted = _INPUT_ESCAPE_RE.sub(lambda match: _INPUT_ESCAPE_NAMES[match.group()], formatted)
     
-    for char in control_chars_to_remove:
-        formatted = formatted.replace(char, '')
+    # Editing keys
+    formatted = formatted.translate(_INPUT_EDITING_KEYS)
     
     return formatted
 
-def clean_user_input(text, input_context):
+def clean_user_input(data, input_context):
     """Format user input for logging, preserving navigation operations."""
     # Use the new formatting function that preserves but formats navigation keys
-    return format_input_for_logging(text)
+    return format_input_for_logging(data)
+
+def write_all(fd, data):
+    """Write all of data to fd, waiting for room if fd is non-blocking."""
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            select.select([], [fd], [])
+            continue
+        view = view[written:]
+
+def read_and_relay_output(master_fd, log_file, output_buffer, clean_input):
+    """Drain available output from master_fd, display to terminal, and log without ANSI codes.
 
-def read_and_relay_output(master_fd, log_file, output_buffer, current_input_line):
-    """Read output from master_fd, display to terminal, and log without ANSI codes."""
+    master_fd must be non-blocking, and clean_input is the stripped, encoded current
+    input line used to filter echoes. At most _DRAIN_LIMIT bytes are handled per call;
+    anything left keeps master_fd readable. Returns False once the subprocess side is closed.
+    """
+    # The buffered bytes hold no line ending, so only newly read data is searched
+    search_start = len(output_buffer)
+    pty_open = True
+    drained = 0
     try:
-        data = os.read(master_fd, 1024)
-        if data:
+        # Keep reading until the PTY is empty (or the drain limit is reached) so
+        # the subprocess isn't left blocked. Only EAGAIN means empty: Linux PTYs
+        # return at most ~4KB per read, so a short read says nothing about what
+        # is still queued. Each read asks only for what the limit has left.
+        while drained < _DRAIN_LIMIT:
+            data = os.read(master_fd, min(_READ_CHUNK, _DRAIN_LIMIT - drained))
+            if not data:
+                pty_open = False
+                break
+            drained += len(data)
             # Display original output with ANSI codes to terminal
-            os.write(sys.stdout.fileno(), data)
-            sys.stdout.flush()
+            # (a raw fd write bypasses sys.stdout's buffer, so there is nothing to flush).
+            # A chunk may not fit in one write, so write all of it.
+            write_all(sys.stdout.fileno(), data)
             # Strip ANSI codes when logging output
-            clean_output = strip_ansi_codes_for_output(data.decode('utf-8', errors='replace'))
-            output_buffer['data'] += clean_output
-            
-            # Log complete lines, but filter out echo of user input
-            if '\n' in output_buffer['data'] or '\r' in output_buffer['data']:
-                lines = output_buffer['data'].replace('\r', '\n').split('\n')
-                for line in lines[:-1]:  # All complete lines
-                    stripped_line = line.strip()
-                    if stripped_line and not is_echo_of_input(stripped_line, current_input_line['data']):
-                        log_file.write(f"[OUTPUT] {stripped_line}\n")
-                output_buffer['data'] = lines[-1]  # Keep incomplete line in buffer
-                log_file.flush()
-            return True
-        return False
+            output_buffer.extend(strip_ansi_codes_for_output(data))
+    except BlockingIOError:
+        pass  # Everything available has been read
     except OSError:
-        return False
+        pty_open = False
+    
+    # Log complete lines, but filter out echo of user input
+    line_end = max(output_buffer.rfind(b'\n', search_start),
+                   output_buffer.rfind(b'\r', search_start))
+    if line_end != -1:
+        # Split on \r, \n and \r\n in one pass; the slice ends on a line ending
+        lines = bytes(output_buffer[:line_end + 1]).splitlines()
+        del output_buffer[:line_end + 1]  # Keep incomplete line in buffer
+        # Collect the log lines and hand them to the log file in one write. The
+        # batch holds at most _DRAIN_LIMIT bytes of new output plus the partial
+        # line carried over from the previous call.
+        log_chunks = []
+        for line in lines:  # All complete lines
+            stripped_line = line.strip()
+            if stripped_line and not is_echo_of_input(stripped_line, clean_input):
+                log_chunks += (_OUTPUT_PREFIX, stripped_line, _NEWLINE)
+        del lines  # Release the unstripped copies before joining
+        if log_chunks:
+            log_file.write(b''.join(log_chunks))
+    return pty_open
 
 
-def is_echo_of_input(output_line, current_input):
-    """Check if the output line is likely an echo of user input."""
-    # Check for multiple prompts in one line (character-by-character echo)
-    prompt_count = output_line.count('>>>')
-    if prompt_count > 1:
-        return True
-    
-    # Check for incremental typing patterns like ">>> p>>> pr>>> pri"
-    if '>>>' in output_line:
-        # Extract everything after the last prompt
-        last_prompt_idx = output_line.rfind('>>>')
-        if last_prompt_idx != -1:
-            after_prompt = output_line[last_prompt_idx + 3:].strip()
-            # If it's a short fragment and contains incremental text, it's likely echo
-            if len(after_prompt) < 100 and ('>>>' in output_line[:last_prompt_idx]):
-                return True
-    
-    # Check for shell prompts with similar patterns
-    for prompt in ['$ ', '# ', '> ']:
-        if prompt in output_line and output_line.count(prompt) > 1:
+# Prompts that, repeated within one output line, mark an echo of typing
+_ECHO_PROMPTS = (b'>>>', b'$ ', b'# ', b'> ')
+
+def is_echo_of_input(output_line, clean_input):
+    """Check if the output line is likely an echo of user input.
+
+    Both arguments are bytes, and clean_input is the current input line already stripped.
+    """
+    # Check for multiple prompts in one line (character-by-character echo),
+    # including incremental typing patterns like ">>> p>>> pr>>> pri" and
+    # shell prompts with similar patterns. Each search stops at the second
+    # occurrence, and lines without any prompt (typical command output) cost
+    # one failed search per prompt.
+    for prompt in _ECHO_PROMPTS:
+        first = output_line.find(prompt)
+        if first != -1 and output_line.find(prompt, first + len(prompt)) != -1:
             return True
     
     # Check if it's just echoing what the user is typing
-    cleaned_output = output_line
-    for prompt in ['>>> ', '... ', '$ ', '# ', '> ']:
-        cleaned_output = cleaned_output.replace(prompt, ' ')
-    
-    if current_input and len(current_input.strip()) > 0:
+    if clean_input:
+        cleaned_output = output_line
+        for prompt in (b'>>> ', b'... ', b'$ ', b'# ', b'> '):
+            cleaned_output = cleaned_output.replace(prompt, b' ')
         # Check if the cleaned output contains partial matches of current input
-        clean_input = current_input.strip()
         if clean_input in cleaned_output or cleaned_output.strip() in clean_input:
             return True
     
@@ -169,10 +242,10 @@ def main():
     log_filename = f"{command}-{timestamp}.log"
     
     # Open log file
-    with open(log_filename, 'w', encoding='utf-8') as log_file:
-        log_file.write(f"CLI Log Session: {' '.join(command_args)}\n")
-        log_file.write(f"Started at: {datetime.now().isoformat()}\n")
-        log_file.write("="*80 + "\n\n")
+    with open(log_filename, 'wb', buffering=_LOG_BUFFER_SIZE) as log_file:
+        log_file.write(f"CLI Log Session: {' '.join(command_args)}\n".encode('utf-8'))
+        log_file.write(f"Started at: {datetime.now().isoformat()}\n".encode('utf-8'))
+        log_file.write(b"="*80 + b"\n\n")
         log_file.flush()
         
         # Create a pseudo-terminal
@@ -199,16 +272,23 @@ def main():
         
         else:  # Parent process
             os.close(slave_fd)
+            # Output is drained until the read would block, see read_and_relay_output
+            os.set_blocking(master_fd, False)
             
             # Save original terminal settings
             old_tty = None
             if sys.stdin.isatty():
                 old_tty = termios.tcgetattr(sys.stdin)
             child_exit_status = None
-            input_buffer = ""
-            output_buffer = {"data": ""}
-            current_input_line = {"data": ""}
+            input_buffer = bytearray()  # Formatted input of the line being typed, UTF-8 encoded
+            output_buffer = bytearray()
+            clean_input = b""  # Stripped copy of input_buffer for echo checks
             raw_input_buffer = ""  # Buffer for handling fragmented escape sequences
+            log_pending = False  # Log lines written since the last flush
+            last_flush = time.monotonic()
+            selector = None
+            wakeup_fds = ()
+            pidfd = None
             try:
                 # Set stdin to raw mode if it's a tty
                 if sys.stdin.isatty():
@@ -217,57 +297,128 @@ def main():
                 # Handle window size changes
                 def handle_winch(_signum, _frame):
                     if sys.stdin.isatty():
-                        rows, cols = os.popen('stty size', 'r').read().split()
-                        fcntl.ioctl(master_fd, termios.TIOCSWINSZ,
-                                  struct.pack('HHHH', int(rows), int(cols), 0, 0))
+                        winsize = fcntl.ioctl(sys.stdin.fileno(), termios.TIOCGWINSZ, bytes(_WINSIZE.size))
+                        # Pass the packed struct straight on, pixel sizes included
+                        fcntl.ioctl(master_fd, termios.TIOCSWINSZ, winsize)
                 
                 signal.signal(signal.SIGWINCH, handle_winch)
                 
+                # Only probe for child exit once it has been signalled instead of on every
+                # iteration. Where available (Linux 5.3+) a pidfd becomes readable when the
+                # child exits; otherwise SIGCHLD sets the flag.
+                child_signalled = {"exited": False}
+                if hasattr(os, 'pidfd_open'):
+                    try:
+                        pidfd = os.pidfd_open(pid)
+                    except OSError:
+                        pass
+                if pidfd is None:
+                    # Start out set in case the child exited before the handler was installed
+                    child_signalled["exited"] = True
+                    
+                    def handle_chld(_signum, _frame):
+                        child_signalled["exited"] = True
+                    
+                    signal.signal(signal.SIGCHLD, handle_chld)
+                
+                # Wait for input and output with epoll/kqueue where available.
+                # Those refuse regular files (e.g. stdin redirected from a file),
+                # which plain select() accepts.
+                selector = selectors.DefaultSelector()
+                try:
+                    selector.register(sys.stdin, selectors.EVENT_READ)
+                except PermissionError:
+                    selector.close()
+                    selector = selectors.SelectSelector()
+                    selector.register(sys.stdin, selectors.EVENT_READ)
+                selector.register(master_fd, selectors.EVENT_READ)
+                if pidfd is not None:
+                    selector.register(pidfd, selectors.EVENT_READ)
+                
+                # Signals write a byte to this pipe, so SIGCHLD wakes the selector
+                # and it can otherwise wait without a timeout
+                wakeup_fds = os.pipe()
+                for fd in wakeup_fds:
+                    os.set_blocking(fd, False)
+                signal.set_wakeup_fd(wakeup_fds[1])
+                selector.register(wakeup_fds[0], selectors.EVENT_READ)
+                
                 # Relay I/O between user and subprocess
                 while True:
                     try:
+                        # Check if child process has exited
+                        if child_signalled["exited"]:
+                            child_signalled["exited"] = False
+                            pid_result, status = os.waitpid(pid, os.WNOHANG)
+                            if pid_result != 0:
+                                # Read any remaining output, one bounded drain at a time
+                                while (read_and_relay_output(master_fd, log_file, output_buffer, clean_input)
+                                       and select.select([master_fd], [], [], 0)[0]):
+                                    pass
+                                child_exit_status = status
+                                break
+                        
                         # Check if there's data to read
-                        r, _, _ = select.select([sys.stdin, master_fd], [], [], 0.01)
+                        # Wake up soon enough to notice a quiet spell if the log needs flushing
+                        events = selector.select(_LOG_QUIET_DELAY if log_pending else None)
+                        r = [key.fileobj for key, _ in events]
+                        
+                        if wakeup_fds[0] in r:
+                            # The signal handlers have already run; just empty the pipe
+                            try:
+                                while os.read(wakeup_fds[0], 512):
+                                    pass
+                            except BlockingIOError:
+                                pass
+                        
+                        if pidfd is not None and pidfd in r:
+                            # The child has exited; it is reaped at the top of the loop
+                            child_signalled["exited"] = True
                         
                         if sys.stdin in r:
                             # Read from user input
-                            data = os.read(sys.stdin.fileno(), 1024)
+                            data = os.read(sys.stdin.fileno(), _READ_CHUNK)
                             if data:
-                                os.write(master_fd, data)
+                                write_all(master_fd, data)
                                 # Process input for logging (preserves navigation keys as readable text)
-                                decoded_data = data.decode('utf-8', errors='replace')
-                                formatted_input = clean_user_input(decoded_data, input_buffer)
+                                formatted_input = clean_user_input(data, input_buffer)
                                 
                                 # Add to buffer if there's content
                                 if formatted_input:
-                                    input_buffer += formatted_input
-                                    current_input_line['data'] += formatted_input
+                                    input_buffer.extend(formatted_input.encode('utf-8'))
                                 
                                 # Check for line completion (Enter pressed)
-                                if '\n' in decoded_data or '\r' in decoded_data:
+                                if b'\n' in data or b'\r' in data:
                                     # When Enter is pressed, we want to capture what was actually on the line
                                     # This handles cases where history navigation populated the command
-                                    lines = input_buffer.replace('\r', '\n').split('\n')
-                                    for line in lines[:-1]:  # All complete lines
+                                    line_end = max(input_buffer.rfind(b'\n'), input_buffer.rfind(b'\r'))
+                                    log_chunks = []
+                                    for line in input_buffer[:line_end + 1].splitlines():  # All complete lines
                                         if line.strip():  # Only log non-empty lines
-                                            log_file.write(f"[USER INPUT] {line}\n")
-                                    input_buffer = lines[-1]  # Keep incomplete line in buffer
-                                    current_input_line['data'] = input_buffer  # Reset current line tracker
-                                    log_file.flush()
+                                            log_chunks += (_INPUT_PREFIX, line, _NEWLINE)
+                                    if log_chunks:
+                                        log_file.write(b''.join(log_chunks))
+                                    del input_buffer[:line_end + 1]  # Keep incomplete line in buffer
+                                    log_pending = True
+                                
+                                # Keep the form used for echo checks on output lines up to date
+                                clean_input = bytes(input_buffer.strip())
+                            else:
+                                # End of input (e.g. stdin redirected from a file); stop watching it
+                                selector.unregister(sys.stdin)
                         
                         if master_fd in r:
                             # Read from subprocess output
-                            if not read_and_relay_output(master_fd, log_file, output_buffer, current_input_line):
+                            if not read_and_relay_output(master_fd, log_file, output_buffer, clean_input):
                                 break
+                            log_pending = True
                         
-                        # Check if child process has exited
-                        pid_result, status = os.waitpid(pid, os.WNOHANG)
-                        if pid_result != 0:
-                            # Read any remaining output
-                            while read_and_relay_output(master_fd, log_file, output_buffer, current_input_line):
-                                pass
-                            child_exit_status = status
-                            break
+                        # Flush batched log lines once the session goes quiet, or after
+                        # the flush interval if output keeps streaming
+                        if log_pending and (not events or time.monotonic() - last_flush >= _LOG_FLUSH_INTERVAL):
+                            log_file.flush()
+                            log_pending = False
+                            last_flush = time.monotonic()
                             
                     except KeyboardInterrupt:
                         os.kill(pid, signal.SIGINT)
@@ -276,6 +427,14 @@ def main():
                         break
                 
             finally:
+                if selector is not None:
+                    selector.close()
+                if wakeup_fds:
+                    signal.set_wakeup_fd(-1)
+                    for fd in wakeup_fds:
+                        os.close(fd)
+                if pidfd is not None:
+                    os.close(pidfd)
                 # Restore terminal settings
                 if old_tty is not None:
                     termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_tty)
@@ -289,12 +448,12 @@ def main():
                 
                 # Flush any remaining buffered data
                 if input_buffer.strip():
-                    log_file.write(f"[USER INPUT] {input_buffer}\n")
-                if output_buffer["data"].strip():
-                    log_file.write(f"[OUTPUT] {output_buffer['data']}\n")
+                    log_file.write(b''.join((_INPUT_PREFIX, input_buffer, _NEWLINE)))
+                if output_buffer.strip():
+                    log_file.write(b''.join((_OUTPUT_PREFIX, output_buffer, _NEWLINE)))
                 
-                log_file.write(f"\n\nSession ended at: {datetime.now().isoformat()}\n")
-                log_file.write(f"Exit code: {exit_code}\n")
+                log_file.write(f"\n\nSession ended at: {datetime.now().isoformat()}\n".encode('utf-8'))
+                log_file.write(f"Exit code: {exit_code}\n".encode('utf-8'))
                 
                 sys.exit(exit_code)
 